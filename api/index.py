@@ -7,15 +7,20 @@ from .routes.scan_route import scan_bp
 # 建立 Flask 應用實例
 app = Flask(__name__)
 
+# 健康檢查的回應內容，Cloudflare Worker 橋接器也會直接使用它，不必進入 Flask
+HEALTH_CHECK_MESSAGE = "Python backend is running."
+
 # 註冊藍圖，並為所有路由加上 /api 的前綴
 # 例如，/backtest 會變成 /api/backtest
 app.register_blueprint(backtest_bp, url_prefix='/api')
 app.register_blueprint(scan_bp, url_prefix='/api')
 
 @app.route('/', methods=['GET'])
+@app.route('/api', methods=['GET'])
 def index():
     """
     根路由，用於健康檢查。
     這個路由保持不變，因為它不屬於任何特定功能。
+    /api 也指向同一個健康檢查，因為 Cloudflare Worker 只會收到 /api/* 的請求。
     """
-    return "Python backend is running."
+    return HEALTH_CHECK_MESSAGE
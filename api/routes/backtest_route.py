@@ -7,7 +7,7 @@ import traceback
 
 # 使用相對路徑從上層的 utils 模組匯入核心邏輯
 from ..utils.data_handler import read_price_data_from_repo, validate_data_completeness
-from ..utils.simulation import run_simulation
+from ..utils.simulation import run_simulation, validate_cash_flows, CashFlowConfigError
 from ..utils.calculations import calculate_metrics
 
 # 建立一個名為 'backtest' 的藍圖
@@ -22,6 +22,13 @@ def backtest_handler():
         end_date = pd.to_datetime(f"{data['endYear']}-{data['endMonth']}-01") + MonthEnd(0)
         end_date_str = end_date.strftime('%Y-%m-%d')
         
+        # 在讀取價格資料前先檢查定期投入/提領設定
+        for p in data['portfolios']:
+            try:
+                validate_cash_flows(p.get('cashFlows'))
+            except CashFlowConfigError as e:
+                return jsonify({'error': f'投資組合 "{p.get("name", "")}" 的現金流設定錯誤: {str(e)}'}), 400
+
         all_tickers = set(ticker for p in data['portfolios'] for ticker in p['tickers'])
         benchmark_ticker = data.get('benchmark')
         if benchmark_ticker:
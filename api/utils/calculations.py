@@ -68,3 +68,50 @@ def calculate_metrics(portfolio_history, benchmark_history=None, risk_free_rate=
     if alpha is not None and (not np.isfinite(alpha) or np.isnan(alpha)): alpha = None
 
     return {'cagr': cagr, 'mdd': mdd, 'volatility': annual_std, 'sharpe_ratio': sharpe_ratio, 'sortino_ratio': sortino_ratio, 'beta': beta, 'alpha': alpha}
+
+def calculate_xirr(cash_flow_dates, cash_flows, max_iterations=100, tolerance=1e-10):
+    """
+    計算資金加權報酬率 (XIRR)。
+    cash_flows 以投資人的角度記錄：投入為負值，提領與期末價值為正值。
+    先以牛頓法求解，若不收斂再改用二分法；無解時回傳 None。
+    """
+    amounts = np.asarray(cash_flows, dtype=float)
+    if len(amounts) < 2 or not (amounts > 0).any() or not (amounts < 0).any():
+        return None
+
+    dates = pd.DatetimeIndex(cash_flow_dates)
+    years = np.asarray((dates - dates[0]).days, dtype=float) / DAYS_PER_YEAR
+    if years.max() <= 0:
+        return None
+
+    def npv(rate):
+        return (amounts / (1 + rate) ** years).sum()
+
+    rate = 0.1
+    for _ in range(max_iterations):
+        discount = (1 + rate) ** years
+        value = (amounts / discount).sum()
+        derivative = (-years * amounts / (discount * (1 + rate))).sum()
+        if abs(derivative) < EPSILON:
+            break
+        next_rate = rate - value / derivative
+        if next_rate <= -1:
+            break
+        if abs(next_rate - rate) < tolerance:
+            return next_rate if np.isfinite(next_rate) else None
+        rate = next_rate
+
+    low, high = -0.9999, 1.0
+    while npv(low) * npv(high) > 0 and high < 1e6:
+        high *= 10
+    if npv(low) * npv(high) > 0:
+        return None
+    for _ in range(max_iterations * 2):
+        mid = (low + high) / 2
+        if npv(low) * npv(mid) <= 0:
+            high = mid
+        else:
+            low = mid
+        if high - low < tolerance:
+            break
+    return (low + high) / 2
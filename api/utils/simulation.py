@@ -1,6 +1,9 @@
 import numpy as np
 import pandas as pd
-from .calculations import calculate_metrics, EPSILON
+from .calculations import calculate_metrics, calculate_xirr, EPSILON, DAYS_PER_YEAR
+
+# 定期投入/提領支援的頻率，與再平衡週期共用同一套「每期第一個交易日」的規則
+CASH_FLOW_FREQUENCIES = ('monthly', 'quarterly', 'annually')
 
 def get_rebalancing_dates(df_prices, period):
     if period == 'never': return []
@@ -18,36 +21,142 @@ def get_rebalancing_dates(df_prices, period):
         return []
     return rebalance_dates[1:] if len(rebalance_dates) > 1 else []
 
+def calculate_unit_values(df_prices, weights, rebalancing_period):
+    """
+    以向量化方式計算投資組合的單位淨值 (期初為 1，不受現金流影響)。
+    兩次再平衡之間持股數不變，因此每一段的淨值 = 段首淨值 × 各資產相對段首價格的加權和。
+    """
+    prices = df_prices.to_numpy(dtype=float)
+    is_segment_start = df_prices.index.isin(get_rebalancing_dates(df_prices, rebalancing_period))
+    is_segment_start[0] = True
+    segment_ids = np.cumsum(is_segment_start) - 1
+    start_prices = prices[is_segment_start]
+
+    # 每段結束 (即下一次再平衡當天) 以舊持股計算的成長倍數，累乘後即為各段段首的淨值
+    segment_growth = (start_prices[1:] / (start_prices[:-1] + EPSILON)) @ weights
+    segment_base = np.concatenate(([1.0], np.cumprod(segment_growth)))
+
+    unit_values = segment_base[segment_ids] * ((prices / (start_prices[segment_ids] + EPSILON)) @ weights)
+    unit_values[0] = 1.0
+    return unit_values
+
+class CashFlowConfigError(ValueError):
+    """定期投入/提領設定不合法時拋出，API 會將其轉為 400 錯誤。"""
+
+def _is_finite_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and np.isfinite(value)
+
+def validate_cash_flows(cash_flow_configs):
+    """
+    檢查定期投入/提領設定，任何一筆不合法即拋出 CashFlowConfigError。
+    每筆設定必須是 dict，amount 必須是有限數值，inflationRate 若有提供也必須是有限數值。
+    """
+    if cash_flow_configs is None:
+        return
+    if not isinstance(cash_flow_configs, list):
+        raise CashFlowConfigError("cashFlows 必須是列表。")
+    for i, config in enumerate(cash_flow_configs, start=1):
+        if not isinstance(config, dict):
+            raise CashFlowConfigError(f"第 {i} 筆現金流設定必須是物件。")
+        if not _is_finite_number(config.get('amount')):
+            raise CashFlowConfigError(f"第 {i} 筆現金流的金額 (amount) 必須是有限數值。")
+        frequency = config.get('frequency', 'monthly')
+        if frequency not in CASH_FLOW_FREQUENCIES:
+            raise CashFlowConfigError(f"第 {i} 筆現金流的頻率不支援：{frequency}")
+        inflation_rate = config.get('inflationRate')
+        if inflation_rate is not None and not _is_finite_number(inflation_rate):
+            raise CashFlowConfigError(f"第 {i} 筆現金流的通膨調整 (inflationRate) 必須是有限數值。")
+
+def build_cash_flow_schedule(df_prices, cash_flow_configs):
+    """
+    將定期投入/提領設定展開為每個交易日的現金流矩陣 (每筆設定一列，投入為正、提領為負)。
+    每筆設定格式為 {'amount': 1000, 'frequency': 'monthly', 'inflationRate': 2}，
+    inflationRate 為選填的年通膨調整 (%)，金額會在每滿一年後依此調升。
+    """
+    validate_cash_flows(cash_flow_configs)
+    cash_flow_configs = cash_flow_configs or []
+    flow_matrix = np.zeros((len(cash_flow_configs), len(df_prices)))
+    if not cash_flow_configs:
+        return flow_matrix
+
+    years_elapsed = np.floor(np.asarray((df_prices.index - df_prices.index[0]).days, dtype=float) / DAYS_PER_YEAR)
+    for row, config in zip(flow_matrix, cash_flow_configs):
+        inflation_rate = (config.get('inflationRate') or 0) / 100.0
+        is_flow_date = df_prices.index.isin(get_rebalancing_dates(df_prices, config.get('frequency', 'monthly')))
+        row[is_flow_date] = config['amount'] * (1 + inflation_rate) ** years_elapsed[is_flow_date]
+    return flow_matrix
+
+def apply_cash_flows(unit_values, initial_amount, cash_flows):
+    """
+    以單位會計法 (unit accounting) 計算含現金流的投資組合價值。
+    每筆現金流以當日單位淨值買入或賣出單位數，持有單位數即為累積和。
+    若提領使資產耗盡，當日只能提領剩餘價值，之後的現金流與價值皆為零。
+    回傳 (每日價值, 實際發生的淨現金流, 資產耗盡的索引或 None)。
+    """
+    # 單位淨值從 1.0 開始且不為負，只需避開淨值為零 (資產價格歸零) 的情況
+    unit_changes = np.divide(cash_flows, unit_values, out=np.zeros_like(cash_flows), where=unit_values > 0)
+    unit_changes[0] += initial_amount / unit_values[0]
+    units = np.cumsum(unit_changes)
+
+    ruin_index = None
+    depleted = np.flatnonzero((cash_flows < 0) & (units < EPSILON))
+    if len(depleted):
+        ruin_index = depleted[0]
+        cash_flows = cash_flows.copy()
+        units_before = units[ruin_index - 1] if ruin_index > 0 else initial_amount / unit_values[0]
+        cash_flows[ruin_index] = -max(units_before, 0.0) * unit_values[ruin_index]
+        cash_flows[ruin_index + 1:] = 0.0
+        units[ruin_index:] = 0.0
+
+    return units * unit_values, cash_flows, ruin_index
+
+def summarize_cash_flows(flow_matrix, cash_flows, ruin_index, initial_amount):
+    """
+    在各筆設定淨額相抵之前，分別加總總投入 (含初始金額) 與總提領。
+    資產耗盡當天的提領以實際淨現金流回推，之後的現金流不計入。
+    """
+    end = flow_matrix.shape[1] if ruin_index is None else ruin_index
+    executed = flow_matrix[:, :end]
+    contributions = initial_amount + executed[executed > 0].sum()
+    withdrawals = -executed[executed < 0].sum()
+    if ruin_index is not None:
+        ruin_day_contributions = flow_matrix[:, ruin_index].clip(min=0).sum()
+        contributions += ruin_day_contributions
+        withdrawals += ruin_day_contributions - cash_flows[ruin_index]
+    # 加上 0.0 避免回傳 -0.0
+    return float(contributions) + 0.0, float(withdrawals) + 0.0
+
 def run_simulation(portfolio_config, price_data, initial_amount, benchmark_history=None):
     tickers = portfolio_config['tickers']
     weights = np.array(portfolio_config['weights']) / 100.0
     rebalancing_period = portfolio_config['rebalancingPeriod']
-    df_prices = price_data[tickers].copy()
+    df_prices = price_data[tickers].dropna()
     if df_prices.empty: return None
-    
-    portfolio_history = pd.Series(index=df_prices.index, dtype=float, name="value")
-    rebalancing_dates = get_rebalancing_dates(df_prices, rebalancing_period)
-    
-    current_date = df_prices.index[0]
-    initial_prices = df_prices.loc[current_date]
-    shares = (initial_amount * weights) / (initial_prices + EPSILON)
-    portfolio_history.loc[current_date] = initial_amount
-    
-    for i in range(1, len(df_prices)):
-        current_date = df_prices.index[i]
-        current_prices = df_prices.loc[current_date]
-        
-        current_value = (shares * current_prices).sum()
-        portfolio_history.loc[current_date] = current_value
-        
-        if current_date in rebalancing_dates:
-            shares = (current_value * weights) / (current_prices + EPSILON)
-            
-    portfolio_history.dropna(inplace=True)
-    metrics = calculate_metrics(portfolio_history.to_frame('value'), benchmark_history)
-    
+
+    unit_values = calculate_unit_values(df_prices, weights, rebalancing_period)
+    flow_matrix = build_cash_flow_schedule(df_prices, portfolio_config.get('cashFlows'))
+    values, cash_flows, ruin_index = apply_cash_flows(unit_values, initial_amount, flow_matrix.sum(axis=0))
+    total_contributions, total_withdrawals = summarize_cash_flows(flow_matrix, cash_flows, ruin_index, initial_amount)
+
+    # 時間加權指標與圖表都以單位淨值計算，不受投入/提領的時間點影響，才能與未含現金流的基準比較。
+    # 圖表以初始金額為起點 (初始金額為零時以 1 為起點)。
+    time_weighted_values = unit_values * (initial_amount if initial_amount > 0 else 1.0)
+    portfolio_history = pd.DataFrame({'value': time_weighted_values}, index=df_prices.index)
+    metrics = calculate_metrics(portfolio_history.copy(), benchmark_history)
+
+    # 資金加權報酬率：以投資人角度，投入為負、提領與期末價值為正
+    investor_flows = -cash_flows
+    investor_flows[0] -= initial_amount
+    investor_flows[-1] += values[-1]
+    has_flow = investor_flows != 0
+    xirr = calculate_xirr(df_prices.index[has_flow], investor_flows[has_flow])
+
     return {
-        'name': portfolio_config['name'], 
-        **metrics, 
-        'portfolioHistory': [{'date': date.strftime('%Y-%m-%d'), 'value': value} for date, value in portfolio_history.items()]
+        'name': portfolio_config['name'],
+        **metrics,
+        'xirr': xirr,
+        'final_value': float(values[-1]) + 0.0,
+        'total_contributions': total_contributions,
+        'total_withdrawals': total_withdrawals,
+        'portfolioHistory': [{'date': date, 'value': value} for date, value in zip(df_prices.index.strftime('%Y-%m-%d'), time_weighted_values.tolist())]
     }
@@ -0,0 +1,213 @@
+# bench_bridge.py
+# 本地測試工具：在沒有 Cloudflare 執行環境的情況下，量測 functions/api/[[path]].py 橋接器的每請求開銷。
+# 它會注入假的 `js` (Response/Headers/ReadableStream/Object) 與 `pyodide.ffi` 模組，
+# 再將橋接器的耗時與直接呼叫 Flask (WSGI) 的耗時相比較。
+#
+# 使用方式：python bench_bridge.py [每個情境的請求次數]
+
+import sys
+import os
+import json
+import time
+import types
+import asyncio
+import importlib.util
+from io import BytesIO
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_PATH = os.path.join(ROOT_DIR, 'functions', 'api', '[[path]].py')
+
+# --- 假的 Cloudflare / Pyodide API ---
+class FakeHeaders:
+    """模擬 JS 的 Headers 物件 (名稱不分大小寫)。"""
+    def __init__(self, items=None):
+        self._items = {}
+        for key, value in (items or {}).items():
+            self.append(key, value)
+
+    def append(self, key, value):
+        key = key.lower()
+        self._items[key] = f"{self._items[key]}, {value}" if key in self._items else value
+
+    def set(self, key, value):
+        self._items[key.lower()] = value
+
+    def get(self, key, default=None):
+        return self._items.get(key.lower(), default)
+
+    def items(self):
+        return self._items.items()
+
+class FakeReadableStream:
+    """模擬 JS 的 ReadableStream，會反覆呼叫 pull() 直到串流關閉，也可以中途取消。"""
+    def __init__(self, source):
+        self.source = source
+        self.controller = types.SimpleNamespace(chunks=[], closed=False, error_value=None)
+        self.controller.enqueue = self.controller.chunks.append
+        self.controller.close = lambda: setattr(self.controller, 'closed', True)
+        self.controller.error = lambda value: setattr(self.controller, 'error_value', value)
+
+    @classmethod
+    def new(cls, source):
+        return cls(source)
+
+    def pull_once(self):
+        self.source['pull'](self.controller)
+        if self.controller.error_value is not None:
+            raise RuntimeError(self.controller.error_value)
+
+    def read_all(self):
+        while not self.controller.closed:
+            self.pull_once()
+        return self.controller.chunks
+
+    def cancel(self, reason=None):
+        """模擬用戶端中斷連線：JS 執行環境會呼叫 source 的 cancel()。"""
+        self.controller.closed = True
+        self.source['cancel'](reason)
+
+class FakeResponse:
+    """模擬 JS 的 Response 物件。"""
+    def __init__(self, body=None, status=200, headers=None):
+        self.body = body
+        self.status = status
+        self.headers = headers or FakeHeaders()
+
+    def read(self):
+        if isinstance(self.body, FakeReadableStream):
+            return b"".join(self.body.read_all())
+        if isinstance(self.body, str):
+            return self.body.encode('utf-8')
+        return self.body or b""
+
+class FakeProxy:
+    """模擬 pyodide.ffi.create_proxy 回傳的可呼叫代理物件。"""
+    def __init__(self, func):
+        self.func = func
+        self.destroyed = False
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def destroy(self):
+        self.destroyed = True
+
+def fake_to_js(value, dict_converter=None):
+    if isinstance(value, dict) and dict_converter is not None:
+        return dict_converter(value.items())
+    return value
+
+class FakeRequest:
+    """模擬 Cloudflare 傳入的 Request，並記錄 body 被讀取與 clone 的次數。"""
+    def __init__(self, method, url, headers=None, body=b""):
+        self.method = method
+        self.url = url
+        self.headers = FakeHeaders(headers)
+        self._body = body
+        self.body_reads = 0
+        self.clones = 0
+
+    async def bytes(self):
+        self.body_reads += 1
+        if self.body_reads > 1:
+            raise RuntimeError("請求主體已被讀取過")
+        return self._body
+
+    def clone(self):
+        self.clones += 1
+        return FakeRequest(self.method, self.url, dict(self.headers.items()), self._body)
+
+def install_fakes():
+    js = types.ModuleType('js')
+    js.Response = FakeResponse
+    js.Headers = FakeHeaders
+    js.ReadableStream = FakeReadableStream
+    js.Object = types.SimpleNamespace(fromEntries=dict)
+    pyodide = types.ModuleType('pyodide')
+    ffi = types.ModuleType('pyodide.ffi')
+    ffi.create_proxy = FakeProxy
+    ffi.to_js = fake_to_js
+    pyodide.ffi = ffi
+    sys.modules.update({'js': js, 'pyodide': pyodide, 'pyodide.ffi': ffi})
+
+def load_worker():
+    install_fakes()
+    # 本地開發時 api/ 位於專案根目錄，而非 src/
+    sys.path.insert(0, ROOT_DIR)
+    spec = importlib.util.spec_from_file_location('api_worker', WORKER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# --- 量測情境 ---
+# /api/backtest 使用空的投資組合，會在讀取任何遠端資料前就回傳 400，不需要網路。
+BACKTEST_PAYLOAD = json.dumps({'startYear': 2020, 'startMonth': 1, 'endYear': 2020, 'endMonth': 12, 'portfolios': []}).encode('utf-8')
+SCENARIOS = [
+    ('OPTIONS /api/backtest (預檢)', 'OPTIONS', 'https://example.com/api/backtest', {}, b""),
+    ('GET /api (健康檢查)', 'GET', 'https://example.com/api', {}, b""),
+    ('GET /api/unknown (Flask 404)', 'GET', 'https://example.com/api/unknown', {}, b""),
+    ('POST /api/backtest (Flask 400)', 'POST', 'https://example.com/api/backtest', {'Content-Type': 'application/json'}, BACKTEST_PAYLOAD),
+]
+
+def call_flask_directly(flask_app, method, url, headers, body):
+    """不經過橋接器，直接以最小的 WSGI 環境呼叫 Flask，作為比較基準。"""
+    path = url.split('example.com', 1)[1]
+    environ = {
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'https', 'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': False, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        'REQUEST_METHOD': method, 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'CONTENT_TYPE': headers.get('Content-Type', ''), 'CONTENT_LENGTH': str(len(body)),
+        'SERVER_NAME': 'example.com', 'SERVER_PORT': '443', 'SERVER_PROTOCOL': 'HTTP/1.1',
+    }
+    result = flask_app(environ, lambda status, response_headers, exc_info=None: None)
+    try:
+        return b"".join(result)
+    finally:
+        result.close()
+
+def time_per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def main(iterations=2000):
+    worker = load_worker()
+    loop = asyncio.new_event_loop()
+
+    def through_bridge(method, url, headers, body):
+        request = FakeRequest(method, url, headers, body)
+        response = loop.run_until_complete(worker.on_fetch(request, None))
+        assert request.clones == 0 and request.body_reads <= 1
+        assert response.headers.get('Access-Control-Allow-Origin') == '*'
+        return response.status, response.read()
+
+    print(f"每個情境執行 {iterations} 次請求 (單位：微秒/請求)")
+    print(f"{'情境':<34}{'狀態':>6}{'橋接器':>12}{'直接 Flask':>12}{'開銷':>12}")
+    for name, method, url, headers, body in SCENARIOS:
+        status, _ = through_bridge(method, url, headers, body)
+        bridge_us = time_per_call(lambda: through_bridge(method, url, headers, body), iterations)
+        # 預檢與健康檢查在橋接器中不進入 Flask；這裡仍以 Flask 自動的 OPTIONS 回應與 /api 路由作為比較基準
+        direct_us = time_per_call(lambda: call_flask_directly(worker.flask_app, method, url, headers, body), iterations)
+        print(f"{name:<34}{status:>6}{bridge_us:>12.1f}{direct_us:>12.1f}{bridge_us - direct_us:>12.1f}")
+
+    # 確認多區塊的回應會逐塊串流，而不是合併成單一緩衝區
+    stream = worker.stream_body(iter([b"a", b"", b"b", b"c"]))
+    assert isinstance(stream, FakeReadableStream) and stream.read_all() == [b"a", b"b", b"c"]
+    assert stream.source['pull'].destroyed and stream.source['cancel'].destroyed
+
+    # 確認串流被取消 (例如用戶端中斷連線) 時，WSGI 迭代器會被關閉、代理物件會被釋放
+    closed = []
+    def wsgi_body():
+        try:
+            yield from (b"a", b"b", b"c")
+        finally:
+            closed.append(True)
+    stream = worker.stream_body(wsgi_body())
+    stream.pull_once()
+    stream.cancel()
+    assert closed and stream.source['pull'].destroyed and stream.source['cancel'].destroyed
+    loop.close()
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
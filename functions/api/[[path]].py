@@ -5,10 +5,12 @@
 import sys
 import os
 from io import BytesIO
-from urllib.parse import urlparse
+from itertools import chain
+from urllib.parse import urlsplit
 
 # 導入 Cloudflare 環境中可用的 Web-standard API
-from js import Response, Headers
+from js import Response, Headers, ReadableStream, Object
+from pyodide.ffi import create_proxy, to_js
 
 # --- 專案結構設定 ---
 # 將 'src' 目錄添加到 Python 的搜尋路徑中。
@@ -22,43 +24,154 @@ from js import Response, Headers
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
 # 從我們搬移到 src/api/ 的原始程式碼中導入 Flask app
-from api.index import app as flask_app
+from api.index import app as flask_app, HEALTH_CHECK_MESSAGE
+
+# --- 橋接器常數 ---
+# 所有回應都會帶上的 CORS 標頭，以便前端可以呼叫 API
+CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type'),
+)
+
+# 健康檢查路由，與 Flask 的 /api 路由一致。Worker 只會收到 /api/* 的請求，因此不包含根路由 /。
+HEALTH_CHECK_PATHS = frozenset(['/api'])
+
+# 不帶請求主體的方法，不需要讀取 body
+BODYLESS_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+# 每個請求都相同的 WSGI 環境變數，只建立一次，之後每次複製使用
+BASE_ENVIRON = {
+    'wsgi.version': (1, 0),
+    'wsgi.errors': sys.stderr,
+    'wsgi.multithread': False,
+    'wsgi.multiprocess': False,
+    'wsgi.run_once': False,
+    'SCRIPT_NAME': '',
+    'SERVER_PROTOCOL': 'HTTP/1.1',
+}
+
+# --- 輔助函式 ---
+def build_headers(header_items=()):
+    """建立 Cloudflare Headers 物件，並附上 CORS 標頭。"""
+    headers = Headers()
+    for key, value in header_items:
+        headers.append(key, value)
+    for key, value in CORS_HEADERS:
+        headers.set(key, value)
+    return headers
+
+async def read_body(request):
+    """
+    直接讀取請求主體一次（不再 clone 請求）。
+    GET/HEAD/OPTIONS 沒有主體，直接回傳空位元組。
+    """
+    if request.method in BODYLESS_METHODS:
+        return b''
+    body = await request.bytes()
+    # 在 Pyodide 中，Uint8Array 會是 JsProxy，需要轉成 Python bytes
+    return body.to_bytes() if hasattr(body, 'to_bytes') else bytes(body)
+
+def build_environ(request, parsed_url, body):
+    """將 Cloudflare 的 Request 物件轉換為 Flask/Werkzeug 需要的 WSGI 環境變數。"""
+    environ = BASE_ENVIRON.copy()
+    environ['wsgi.url_scheme'] = parsed_url.scheme
+    environ['wsgi.input'] = BytesIO(body)
+    environ['REQUEST_METHOD'] = request.method
+    environ['PATH_INFO'] = parsed_url.path
+    environ['QUERY_STRING'] = parsed_url.query
+    environ['CONTENT_LENGTH'] = str(len(body))
+    environ['SERVER_NAME'] = parsed_url.hostname or ''
+    environ['SERVER_PORT'] = str(parsed_url.port or (443 if parsed_url.scheme == 'https' else 80))
+
+    # 將 HTTP 標頭加入環境變數 (Content-Type / Content-Length 依 WSGI 規範不加 HTTP_ 前綴)
+    for key, value in request.headers.items():
+        key = key.upper().replace('-', '_')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key != 'CONTENT_LENGTH':
+            environ['HTTP_' + key] = value
+    environ.setdefault('CONTENT_TYPE', '')
+    return environ
+
+def close_result(result):
+    """依 WSGI 規範，在回應結束後呼叫 close()。"""
+    close = getattr(result, 'close', None)
+    if close is not None:
+        close()
+
+def stream_body(result):
+    """
+    將 Flask 的回應迭代器包裝成 ReadableStream，逐塊輸出而不合併成單一緩衝區。
+    Flask 大多數的回應 (例如 jsonify) 只有一個區塊，這種情況直接回傳該區塊，省去建立串流的成本。
+    """
+    chunks = (chunk for chunk in result if chunk)
+    try:
+        first = next(chunks, None)
+        second = next(chunks, None) if first is not None else None
+    except Exception:
+        close_result(result)
+        raise
+    if second is None:
+        close_result(result)
+        return to_js(first) if first is not None else None
+
+    pending = chain((first, second), chunks)
+    finished = False
+
+    def finish():
+        """串流結束、出錯或被取消時，關閉 WSGI 迭代器並釋放代理物件 (只執行一次)。"""
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        try:
+            close_result(result)
+        finally:
+            pull_proxy.destroy()
+            cancel_proxy.destroy()
+
+    def pull(controller):
+        try:
+            chunk = next(pending)
+        except StopIteration:
+            finish()
+            controller.close()
+            return
+        except Exception as e:
+            finish()
+            controller.error(f"Worker Error: {type(e).__name__}: {e}")
+            return
+        controller.enqueue(to_js(chunk))
+
+    def cancel(reason=None):
+        # 用戶端中斷連線或串流被取消時，pull 不會再被呼叫，需要在這裡釋放資源
+        finish()
+
+    pull_proxy = create_proxy(pull)
+    cancel_proxy = create_proxy(cancel)
+    source = to_js({'pull': pull_proxy, 'cancel': cancel_proxy}, dict_converter=Object.fromEntries)
+    return ReadableStream.new(source)
 
 # --- Cloudflare Worker 主處理函式 ---
 async def on_fetch(request, env):
     """
     每個 API 請求都會進入這個函式。
+    CORS 預檢 (OPTIONS) 與健康檢查會直接回應，不進入 Flask。
     """
     try:
+        method = request.method
+        if method == 'OPTIONS':
+            return Response(None, status=204, headers=build_headers())
+
+        parsed_url = urlsplit(request.url)
+        if method in ('GET', 'HEAD') and parsed_url.path in HEALTH_CHECK_PATHS:
+            headers = build_headers([('Content-Type', 'text/html; charset=utf-8')])
+            return Response(HEALTH_CHECK_MESSAGE if method == 'GET' else None, status=200, headers=headers)
+
         # --- WSGI 橋接器 ---
-        # 將 Cloudflare 的 Request 物件轉換為 Flask/Werkzeug 需要的 WSGI 環境變數。
-        parsed_url = urlparse(request.url)
-
-        # 複製請求主體，因為它只能被讀取一次。
-        request_body_bytes = await request.clone().bytes()
-
-        environ = {
-            'wsgi.version': (1, 0),
-            'wsgi.url_scheme': parsed_url.scheme,
-            'wsgi.input': BytesIO(request_body_bytes),
-            'wsgi.errors': sys.stderr,
-            'wsgi.multithread': False,
-            'wsgi.multiprocess': False,
-            'wsgi.run_once': False,
-            'REQUEST_METHOD': request.method,
-            'PATH_INFO': parsed_url.path,
-            'QUERY_STRING': parsed_url.query,
-            'CONTENT_TYPE': request.headers.get('Content-Type', ''),
-            'CONTENT_LENGTH': str(len(request_body_bytes)),
-            'SERVER_NAME': parsed_url.hostname,
-            'SERVER_PORT': str(parsed_url.port or (443 if parsed_url.scheme == 'https' else 80)),
-            'SERVER_PROTOCOL': 'HTTP/1.1',
-        }
-
-        # 將 HTTP 標頭加入環境變數
-        for key, value in request.headers.items():
-            key = 'HTTP_' + key.upper().replace('-', '_')
-            environ[key] = value
+        body = await read_body(request)
+        environ = build_environ(request, parsed_url, body)
 
         # Flask 會呼叫這個函式來設定回應的狀態和標頭
         response_headers = []
@@ -70,26 +183,15 @@ async def on_fetch(request, env):
 
         # --- 呼叫 Flask 應用 ---
         result = flask_app(environ, start_response)
-        body = b"".join(result)
-        
+        body_stream = stream_body(result)
+
         # --- 建立 Cloudflare 回應 ---
-        status_code = int(response_status.split(' ')[0])
-        
-        # 建立新的 Headers 物件
-        headers = Headers()
-        for key, value in response_headers:
-            headers.append(key, value)
-        
-        # 確保 CORS 標頭存在，以便前端可以呼叫 API
-        headers.set('Access-Control-Allow-Origin', '*')
-        headers.set('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        headers.set('Access-Control-Allow-Headers', 'Content-Type')
-
-        return Response(body, status=status_code, headers=headers)
+        status_code = int(response_status.split(' ', 1)[0])
+        headers = build_headers(response_headers)
+        return Response(body_stream, status=status_code, headers=headers)
 
     except Exception as e:
         # 錯誤處理
         error_message = f"Worker Error: {type(e).__name__}: {e}"
         print(error_message)
         return Response(error_message, status=500)
-
@@ -121,12 +121,14 @@ export function renderSummaryTable(portfolios, benchmark) {
     table.innerHTML = '';
     const metrics = [ 
         { key: 'cagr', label: '年化報酬率 (CAGR)', format: (v) => `${(v * 100).toFixed(2)}%` }, 
+        { key: 'xirr', label: '資金加權報酬率 (XIRR)', format: (v) => v !== null && v !== undefined ? `${(v * 100).toFixed(2)}%` : 'N/A' },
         { key: 'volatility', label: '年化波動率', format: (v) => `${(v * 100).toFixed(2)}%` },
         { key: 'mdd', label: '最大回撤 (MDD)', format: (v) => `${(v * 100).toFixed(2)}%` }, 
         { key: 'sharpe_ratio', label: '夏普比率', format: (v) => isFinite(v) ? v.toFixed(2) : 'N/A' }, 
         { key: 'sortino_ratio', label: '索提諾比率', format: (v) => isFinite(v) ? v.toFixed(2) : 'N/A' },
         { key: 'beta', label: 'Beta (β)', format: (v) => v !== null ? v.toFixed(2) : 'N/A' },
-        { key: 'alpha', label: 'Alpha (α)', format: (v) => v !== null ? `${(v * 100).toFixed(2)}%` : 'N/A' }
+        { key: 'alpha', label: 'Alpha (α)', format: (v) => v !== null ? `${(v * 100).toFixed(2)}%` : 'N/A' },
+        { key: 'final_value', label: '期末價值 (含投入/提領)', format: (v) => v !== null && v !== undefined ? new Intl.NumberFormat('en-US', { style: 'currency', currency: 'USD' }).format(v) : 'N/A' }
     ];
     const thead = table.createTHead(); const headerRow = thead.insertRow(); headerRow.className = "bg-gray-100";
     headerRow.insertCell().outerHTML = `<th class="text-left pl-2">指標</th>`;